@@ -1,18 +1,21 @@
 # Standard library imports
 import csv
+import json
+import atexit
+import functools
+import re
 import logging
-import asyncio
+import sqlite3
+import threading
 import datetime
-from PyPDF2 import PdfReader
 from browser_use import ActionResult, Controller
 from browser_use.browser.context import BrowserContext
-from config import CV, data_dir
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from config import CV, data_dir, jobs_db_path
+import state
 from typing import Optional
-from pydantic import BaseModel
-from dotenv import load_dotenv
+from pydantic import BaseModel, ConfigDict
 
-
-load_dotenv()
 # Configure logging
 logger = logging.getLogger(__name__)
 # Initialize the controller - this registers actions that the AI agent can perform
@@ -36,8 +39,23 @@ COMMON_APPLICATION_ANSWERS = {
 	
 }
 
-# Global variable to store the last found Easy Apply button to avoid duplicate searches
-_last_found_easy_apply_button = None
+# The answers never change at runtime, so serialize them once at import
+_COMMON_ANSWERS_JSON = json.dumps(COMMON_APPLICATION_ANSWERS)
+
+# LinkedIn pages the actions navigate to
+_LINKEDIN_LOGIN_URL = 'https://www.linkedin.com/login'
+_LINKEDIN_FEED_URL = 'https://www.linkedin.com/feed/'
+# _LINKEDIN_JOBS_URL = 'https://www.linkedin.com/jobs/collections/recommended'
+_LINKEDIN_JOBS_URL = 'https://www.linkedin.com/jobs/collections/easy-apply/'
+
+def _is_logged_in_url(url: str) -> bool:
+	"""Check if LinkedIn has a signed-in user on this page.
+	
+	Only the feed counts: expired sessions and unfinished sign-ins are sent
+	to pages such as /checkpoint, which are not logged in.
+	"""
+	return url.startswith(_LINKEDIN_FEED_URL)
+
 
 class Job(BaseModel):
     """Represents a job listing with relevant details.
@@ -51,6 +69,9 @@ class Job(BaseModel):
         salary: Optional salary information
         status: Optional status of the job application (e.g., 'Applied', 'Saved', etc.)
     """
+    # Jobs are never modified after they are created
+    model_config = ConfigDict(frozen=True, extra='forbid')
+    
     title: str
     link: str
     company: str
@@ -60,58 +81,107 @@ class Job(BaseModel):
     status: Optional[str] = 'Saved'  # Default status is 'Saved'
 
 
-# Module-level variable to store the CSV file path for this run
-csv_file_path = None
+# Columns of a saved job, in the order they are exported to CSV
+FIELD_NAMES = ('title', 'company', 'link', 'fit_score', 'location', 'salary', 'status')
+
+# LinkedIn job ID in a /jobs/view/<id> or /jobs/view/<slug>-<id> path, or a currentJobId=<id> param
+_JOB_ID_RE = re.compile(r'/jobs/view/(?:[^/?#]*-)?(\d+)(?:[/?#]|$)|[?&]currentJobId=(\d+)')
+
 
-def _save_job_to_csv(job: Job, append: bool = True):
-	"""Save job information to a CSV file.
+def _normalize_job_link(link: str) -> str:
+	"""Normalize a job link so every URL of the same job compares equal.
+	
+	LinkedIn links to one job vary with tracking parameters and with the
+	page they were opened from, so links with a job ID are rewritten to the
+	canonical /jobs/view/<id>/ URL. Other links are kept as given apart from
+	their fragment, since their query string may be what identifies the job.
 	
 	Args:
-		job: Job object to save
-		append: Whether to append to the existing file or create a new one
+		link: URL to the job posting
 	
 	Returns:
-		None
+		str: Normalized URL used to store and look up the job
 	"""
-	global csv_file_path
-	if not csv_file_path:
-		timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%I-%M-%S_%p")
-		csv_file_path = data_dir / f'jobs_{timestamp}.csv'
-	file_path = csv_file_path
-	file_exists = file_path.exists()
+	match = _JOB_ID_RE.search(link)
+	if match:
+		return f'https://www.linkedin.com/jobs/view/{match.group(1) or match.group(2)}/'
+	return link.split('#', 1)[0]
+
+
+# SQLite connection to the jobs database, opened once on first use
+_jobs_db = None
+# Links of every job already saved, loaded from the database with the connection
+_applied_links = set()
+# Actions run in worker threads, so guard the shared connection
+_jobs_db_lock = threading.Lock()
+
+
+def _get_jobs_db():
+	"""Get the connection to the jobs database, creating it on first use.
 	
-	# Create the data directory if it doesn't exist
-	data_dir.mkdir(parents=True, exist_ok=True)
+	The database runs in WAL mode with synchronous=NORMAL so each saved job
+	is an atomic append that doesn't wait for an fsync. Jobs are keyed by
+	their normalized link, so saving the same job again updates it in place.
 	
-	# Define the CSV field names
-	field_names = ['title', 'company', 'link', 'fit_score', 'location', 'salary', 'status']
+	Returns:
+		sqlite3.Connection: Open connection to the jobs database
+	"""
+	global _jobs_db
+	if _jobs_db is None:
+		# Create the data directory if it doesn't exist
+		data_dir.mkdir(parents=True, exist_ok=True)
+		
+		conn = sqlite3.connect(jobs_db_path, check_same_thread=False)
+		conn.execute('PRAGMA journal_mode=WAL')
+		conn.execute('PRAGMA synchronous=NORMAL')
+		conn.execute(
+			'CREATE TABLE IF NOT EXISTS jobs ('
+			'link TEXT PRIMARY KEY, title TEXT, company TEXT, fit_score REAL, '
+			'location TEXT, salary TEXT, status TEXT, ts TEXT'
+			') WITHOUT ROWID'
+		)
+		atexit.register(conn.close)
+		_applied_links.update(_normalize_job_link(link) for (link,) in conn.execute('SELECT link FROM jobs'))
+		_jobs_db = conn
+	return _jobs_db
+
+
+def _save_job_to_db(job: Job):
+	"""Save job information to the jobs database.
 	
-	# Open the file in append mode if it exists and append is True, otherwise write mode
-	mode = 'a' if file_exists and append else 'w'
+	Args:
+		job: Job object to save
 	
-	with open(file_path, mode, newline='') as f:
-		writer = csv.DictWriter(f, fieldnames=field_names)
-		
-		# Write header if the file is new or we're not appending
-		if not file_exists or not append:
-			writer.writeheader()
-		
-		# Write the job data
-		writer.writerow({
-			'title': job.title,
-			'company': job.company,
-			'link': job.link,
-			'fit_score': job.fit_score,
-			'location': job.location or '',
-			'salary': job.salary or '',
-			'status': job.status or 'Saved'
-		})
+	Returns:
+		None
+	"""
+	with _jobs_db_lock:
+		conn = _get_jobs_db()
+		conn.execute(
+			'INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+			(
+				job.link,
+				job.title,
+				job.company,
+				job.fit_score,
+				job.location or '',
+				job.salary or '',
+				job.status or 'Saved',
+				# Microsecond precision keeps jobs saved in the same second in save order
+				datetime.datetime.now().isoformat(timespec='microseconds'),
+			),
+		)
+		conn.commit()
+		_applied_links.add(job.link)
 
 @controller.action('Save job information')
 def save_job_information(title: str, company: str, link: str, status: str, fit_score: float = 1.0):
-	"""Save information about a job to the jobs.csv file.
+	"""Save information about a job to the jobs database.
 	
-	This action saves details about a job to a CSV file for tracking purposes.
+	This action saves details about a job to the SQLite jobs database for
+	tracking purposes. Saving the same job again updates it, and LinkedIn
+	links match even if they differ in tracking parameters or the page the
+	job was opened from.
 	
 	Args:
 		title: Job title
@@ -128,39 +198,167 @@ def save_job_information(title: str, company: str, link: str, status: str, fit_s
 		job = Job(
 			title=title,
 			company=company.strip() if company else 'Unknown Company',
-			link=link,
+			link=_normalize_job_link(link),
 			fit_score=fit_score,
 			status=status
 		)
 		
-		_save_job_to_csv(job)
+		_save_job_to_db(job)
 		
 		return ActionResult(
 			extracted_content=f"Successfully saved job information for {title} at {company}"
 		)
 		
 	except Exception as e:
-		logger.error(f"Error saving job information: {str(e)}")
+		logger.error('Error saving job information: %s', e)
 		return ActionResult(error=f"Failed to save job information: {str(e)}")
 
 
+@controller.action('Check if job already applied')
+def check_job_already_applied(link: str):
+	"""Check whether a job has already been saved, so it can be skipped.
+	
+	This is a set lookup against the links in the jobs database, which
+	lets the agent skip jobs it has already attempted without opening them.
+	
+	Args:
+		link: URL to the job posting
+	
+	Returns:
+		ActionResult: Whether the job has already been applied to or attempted
+	"""
+	with _jobs_db_lock:
+		_get_jobs_db()
+		seen = _normalize_job_link(link) in _applied_links
+	
+	if seen:
+		return ActionResult(extracted_content=f'Already applied/attempted {link} - skip this job')
+	return ActionResult(extracted_content=f'Not applied to {link} yet')
+
+
+def _write_jobs_csv(since: Optional[str] = None):
+	"""Write saved jobs from the jobs database to a new CSV file.
+	
+	A new timestamped CSV file is written to the data directory, with jobs
+	in the order they were last saved. No file is written if there are no
+	jobs to export.
+	
+	Args:
+		since: Only export jobs saved at or after this ISO timestamp
+	
+	Returns:
+		tuple: Number of exported jobs and the CSV path, or None as the path
+		       if nothing was exported
+	"""
+	query = f'SELECT {", ".join(FIELD_NAMES)} FROM jobs'
+	params = ()
+	if since:
+		query += ' WHERE ts >= ?'
+		params = (since,)
+	
+	with _jobs_db_lock:
+		rows = _get_jobs_db().execute(query + ' ORDER BY ts', params).fetchall()
+	if not rows:
+		return 0, None
+	
+	timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%I-%M-%S_%p")
+	file_path = data_dir / f'jobs_{timestamp}.csv'
+	with open(file_path, 'w', newline='') as f:
+		writer = csv.writer(f)
+		writer.writerow(FIELD_NAMES)
+		writer.writerows(rows)
+	return len(rows), file_path
+
+
+@controller.action('Export saved jobs to CSV')
+def export_jobs_to_csv():
+	"""Export every saved job from the jobs database to a CSV file.
+	
+	A new timestamped CSV file is written to the data directory on each
+	call, with jobs in the order they were last saved.
+	
+	Returns:
+		ActionResult: Path of the CSV file or error information
+	"""
+	try:
+		count, file_path = _write_jobs_csv()
+		if file_path is None:
+			msg = 'No saved jobs to export'
+		else:
+			msg = f'Exported {count} saved jobs to {file_path}'
+		logger.info(msg)
+		return ActionResult(extracted_content=msg)
+		
+	except Exception as e:
+		logger.error('Error exporting saved jobs: %s', e)
+		return ActionResult(error=f"Failed to export saved jobs: {str(e)}")
+
+
+def export_run_jobs_to_csv(run_started_at: str):
+	"""Export the jobs saved during this run to a CSV file.
+	
+	Nothing is written if no job was saved since the run started, and the
+	jobs database is not created just to find that out.
+	
+	Args:
+		run_started_at: ISO timestamp of when the run started
+	
+	Returns:
+		Path: Path of the CSV file, or None if nothing was exported
+	"""
+	# Every save opens the database, so an unopened one means nothing was saved
+	if _jobs_db is None:
+		return None
+	try:
+		count, file_path = _write_jobs_csv(since=run_started_at)
+	except Exception as e:
+		logger.error('Error exporting saved jobs: %s', e)
+		return None
+	if file_path is not None:
+		logger.info('Exported %d jobs saved this run to %s', count, file_path)
+	return file_path
+
+
+@functools.lru_cache(maxsize=4)
+def _extract_cv_text(path: str, mtime: float, size: int) -> str:
+	"""Extract the text of a PDF, cached by path, mtime and size.
+	
+	The mtime and size are only part of the cache key, so the PDF is
+	parsed again as soon as the file on disk changes.
+	
+	Args:
+		path: Path to the PDF file
+		mtime: Modification time of the file
+		size: Size of the file in bytes
+	
+	Returns:
+		str: Text of every page, in reading order
+	"""
+	# Imported here so runs that never read the CV don't pay for loading PyMuPDF
+	import pymupdf
+	
+	# Use the context manager so the document is closed after every call
+	with pymupdf.open(path) as doc:
+		text = '\n'.join(page.get_text('text') for page in doc)
+	logger.info('Read cv with %d characters', len(text))
+	return text
+
+
 @controller.action('Read my cv for context to fill forms')
 def read_cv():
 	"""Extract text from the resume/CV file.
 	
 	This action allows the AI to understand the user's background,
 	skills, and experience to better match job listings and
-	potentially fill out application forms.
+	potentially fill out application forms. The extracted text is
+	cached and only re-read when the CV file changes.
 	
 	Returns:
 		ActionResult: CV text content with memory flag set to True
 		             so it stays in the AI's context
 	"""
-	pdf = PdfReader(CV)
-	text = ''
-	for page in pdf.pages:
-		text += page.extract_text() or ''
-	logger.info(f'Read cv with {len(text)} characters')
+	st = CV.stat()
+	text = _extract_cv_text(str(CV), st.st_mtime, st.st_size)
 	return ActionResult(extracted_content=text, include_in_memory=True)
 
 
@@ -181,9 +379,6 @@ async def upload_cv(index: int, browser: BrowserContext):
 	Returns:
 		ActionResult: Success message or error information
 	"""
-	# Get the absolute path to the CV file
-	path = str(CV.absolute())
-	
 	# Get the DOM element at the specified index
 	dom_el = await browser.get_dom_element_by_index(index)
 
@@ -196,7 +391,7 @@ async def upload_cv(index: int, browser: BrowserContext):
 
 	# Check if it's a file upload element
 	if file_upload_dom_el is None:
-		logger.info(f'No file upload element found at index {index}')
+		logger.info('No file upload element found at index %s', index)
 		return ActionResult(error=f'No file upload element found at index {index}')
 
 	# Locate the element in the browser
@@ -204,17 +399,17 @@ async def upload_cv(index: int, browser: BrowserContext):
 
 	# Check if the element was located
 	if file_upload_el is None:
-		logger.info(f'No file upload element found at index {index}')
+		logger.info('No file upload element found at index %s', index)
 		return ActionResult(error=f'No file upload element found at index {index}')
 
 	# Try to upload the file
 	try:
-		await file_upload_el.set_input_files(path)
+		await file_upload_el.set_input_files(str(CV))
 		msg = f'Successfully uploaded file to index {index}'
 		logger.info(msg)
 		return ActionResult(extracted_content=msg)
 	except Exception as e:
-		logger.debug(f'Error in set_input_files: {str(e)}')
+		logger.debug('Error in set_input_files: %s', e)
 		return ActionResult(error=f'Failed to upload file to index {index}')
 
 
@@ -222,8 +417,10 @@ async def upload_cv(index: int, browser: BrowserContext):
 async def login_to_linkedin(browser: BrowserContext):
 	"""Login to LinkedIn by prompting the user to sign in manually.
 	
-	This action navigates to LinkedIn login page and displays a prompt
-	for the user to manually sign in, then waits for successful login.
+	This action first checks whether saved session cookies are still
+	logged in. Otherwise it navigates to LinkedIn login page and displays
+	a prompt for the user to manually sign in, then waits for successful
+	login and saves the session cookies for the next run.
 	
 	Args:
 		browser: Browser context for interacting with the webpage
@@ -232,41 +429,52 @@ async def login_to_linkedin(browser: BrowserContext):
 		ActionResult: Success message or error information
 	"""
 	try:
-		# Navigate to LinkedIn login page
-		logger.info('Navigating to LinkedIn login page')
-		page = await browser.get_current_page()
-		await page.goto('https://www.linkedin.com/login')
-		await page.wait_for_load_state()
-		
-		# User needs to manually sign in
-		msg = 'Please sign in to LinkedIn manually'
-		logger.info(msg)
-		
-		# Wait for user to manually log in (max 300 seconds = 5 minutes)
-		for i in range(60):  # 60 * 5 seconds = 300 seconds max wait time
-			await asyncio.sleep(5)  # Sleep for 5 seconds
+		# Only one agent prompts the user at a time; the others wait here
+		async with state.linkedin_login_lock:
 			page = await browser.get_current_page()
-			current_url = page.url
-			logger.info(f'Waiting for manual login, current URL: {current_url}')
 			
-			# Check if user has logged in by examining the URL
-			if 'feed' in current_url or 'checkpoint' in current_url or 'dashboard' in current_url or 'home' in current_url:
-				success_msg = '🔒 Successfully logged in to LinkedIn'
-				logger.info(success_msg)
-				return ActionResult(extracted_content=success_msg, include_in_memory=True)
+			# Another agent already logged in, reuse its session cookies in this context
+			if state.linkedin_logged_in:
+				await page.context.add_cookies(state.linkedin_cookies)
+			
+			# Cookies saved by a previous run or another agent may already be logged in,
+			# in which case LinkedIn serves the feed instead of redirecting to the login page.
+			# The agent waits for the page to settle itself, so only wait for the DOM
+			await page.goto(_LINKEDIN_FEED_URL, wait_until='domcontentloaded')
+			
+			if not _is_logged_in_url(page.url):
+				# Navigate to LinkedIn login page
+				logger.info('Navigating to LinkedIn login page')
+				await page.goto(_LINKEDIN_LOGIN_URL, wait_until='domcontentloaded')
 				
-			# Every 12 iterations (about 1 minute), remind the user to log in
-			if i % 12 == 0 and i > 0:
-				logger.info('Still waiting for manual login. Please complete the login process.')
-		
-		# If we get here, login timed out
-		return ActionResult(
-			extracted_content="Navigated to LinkedIn login page. Please sign in manually. The login process is taking longer than expected. Please complete the login to continue.",
-			include_in_memory=True
-		)
+				# User needs to manually sign in
+				msg = 'Please sign in to LinkedIn manually'
+				logger.info(msg)
+				
+				# Wait for user to manually log in and reach the feed (max 300 seconds = 5 minutes).
+				# wait_for_url wakes on the navigation event itself, no polling needed
+				try:
+					await page.wait_for_url(_is_logged_in_url, timeout=300_000)
+				except PlaywrightTimeoutError:
+					# If we get here, login timed out
+					return ActionResult(
+						extracted_content="Navigated to LinkedIn login page. Please sign in manually. The login process is taking longer than expected. Please complete the login to continue.",
+						include_in_memory=True
+					)
+				
+				# Persist the session so the next run can skip the manual login
+				await browser.save_cookies()
+			
+			# Share the session with agents running in other browser contexts
+			state.linkedin_cookies = await page.context.cookies()
+			state.linkedin_logged_in = True
+			
+			success_msg = '🔒 Successfully logged in to LinkedIn'
+			logger.info(success_msg)
+			return ActionResult(extracted_content=success_msg, include_in_memory=True)
 		
 	except Exception as e:
-		logger.error(f'Error during LinkedIn login process: {str(e)}')
+		logger.error('Error during LinkedIn login process: %s', e)
 		return ActionResult(error=f'Failed to navigate to LinkedIn login page: {str(e)}')
 
 
@@ -280,7 +488,7 @@ def get_common_application_answers():
 	Returns:
 		str: JSON string of common application questions and answers
 	"""
-	return str(COMMON_APPLICATION_ANSWERS)
+	return _COMMON_ANSWERS_JSON
 
 
 @controller.registry.action('Browse LinkedIn jobs', requires_browser=True)
@@ -298,16 +506,14 @@ async def search_linkedin_jobs(browser: BrowserContext):
 	try:
 		# Navigate to LinkedIn recommended jobs page
 		page = await browser.get_current_page()
-		# await page.goto('https://www.linkedin.com/jobs/collections/recommended')
-		await page.goto('https://www.linkedin.com/jobs/collections/easy-apply/')
-		await page.wait_for_load_state()
+		await page.goto(_LINKEDIN_JOBS_URL, wait_until='domcontentloaded')
 		
 		msg = '🔍 Successfully navigated to LinkedIn recommended jobs'
 		logger.info(msg)
 		return ActionResult(extracted_content=msg, include_in_memory=True)
 		
 	except Exception as e:
-		logger.debug(f'Error navigating to LinkedIn jobs: {str(e)}')
+		logger.debug('Error navigating to LinkedIn jobs: %s', e)
 		return ActionResult(error=f'Failed to navigate to LinkedIn jobs: {str(e)}')
 
 
@@ -5,6 +5,7 @@ from pydantic import SecretStr  # For data validation and secure API key handlin
 from langchain_openai import ChatOpenAI  # For creating the LLM agent
 from browser_use.browser.browser import Browser, BrowserConfig
 from pathlib import Path
+from dataclasses import replace
 from langchain_core.caches import InMemoryCache  # Import for caching
 
 # Initialize the language model using Vercel AI Gateway
@@ -26,6 +27,7 @@ browser = Browser(
 		disable_security=True,  # Disable security features that might block automation
 	)
 )
+
 # Number of applications to be made
 num_of_applications = 20
 
@@ -35,3 +37,19 @@ CV = Path.cwd() / 'data' / 'resume.pdf'
 # Path to the data directory
 data_dir = Path.cwd() / 'data'
 
+# Path to the SQLite database of saved jobs
+jobs_db_path = data_dir / 'jobs.db'
+
+# Path to the saved LinkedIn session cookies, reused so later runs skip the manual login
+linkedin_cookies_file = data_dir / 'linkedin_cookies.json'
+
+
+async def new_context():
+	"""Create an isolated browser context (own cookies and tabs) on the shared browser.
+	
+	Every context uses the browser's default context config with
+	cookies_file pointed at linkedin_cookies_file, so each agent loads and
+	saves the LinkedIn session cookies.
+	"""
+	context_config = replace(browser.config.new_context_config, cookies_file=str(linkedin_cookies_file))
+	return await browser.new_context(context_config)
@@ -1,14 +1,13 @@
 import os
-from dotenv import load_dotenv
 import sys
 import asyncio
+import datetime
 import logging
 from browser_use import Agent
-from actions import controller
-from config import model, browser, num_of_applications
+from actions import controller, export_run_jobs_to_csv
+from config import model, browser, new_context, num_of_applications
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-load_dotenv()
 logger = logging.getLogger(__name__)
 
 
@@ -18,7 +17,7 @@ async def main():
     This function:
     1. Defines the task for the AI agent
     2. Creates the language model
-    3. Creates and runs the agent(s)
+    3. Creates and runs the agent(s), each in its own browser context
     """
 
 
@@ -33,10 +32,11 @@ async def main():
         "3. Use 'Browse LinkedIn jobs' action to view recommended job listings\n"
         "4. For each job listing:\n"
         "   a. Click/scroll down through the list of jobs to see if it has a quick apply button. You may have to scroll down on the list and navigate to the next page to see more jobs with quick apply.\n"
+        "   b. Before applying, use 'Check if job already applied' action with the job link and skip this job if it was already applied to or attempted\n"
         # "   b. Only if the job has a quick apply button, click *quick apply* button and apply to the job. Otherwise, skip this job.\n"
-        "   b. For multi-step applications, fill out forms using your CV information and 'Get common application answers' action to fill out questions. However if an input field is already filled, skip it.\n"
-        "   c. Uncheck 'Follow company to stay up to date with their page.' before submitting the application. You may have to scroll down on the dialog to find this option and the submit button.\n"
-        "   d. Close the confirmation dialog and use 'Save job information' action to save the job details\n"
+        "   c. For multi-step applications, fill out forms using your CV information and 'Get common application answers' action to fill out questions. However if an input field is already filled, skip it.\n"
+        "   d. Uncheck 'Follow company to stay up to date with their page.' before submitting the application. You may have to scroll down on the dialog to find this option and the submit button.\n"
+        "   e. Close the confirmation dialog and use 'Save job information' action to save the job details\n"
         # f"5. Repeat this process for at least {num_of_applications} job listings. Only run 'done' action and quit when you have applied to {num_of_applications} jobs successfully\n"
         f"5. Repeat this process indefinitely until the user runs 'done' action and quits the program\n"
 
@@ -48,14 +48,26 @@ async def main():
 
     # Create agents for each task
     agents = []
+    contexts = []
     for task in tasks:
-        # Each agent gets the task, language model, controller, and browser
-        agent = Agent(task=task, llm=model, controller=controller, browser=browser)
+        # Each agent gets its own browser context that loads and saves the LinkedIn session cookies
+        context = await new_context()
+        contexts.append(context)
+        # Each agent gets the task, language model, controller, and browser context
+        agent = Agent(task=task, llm=model, controller=controller, browser=browser, browser_context=context)
         agents.append(agent)
 
     # Run all agents concurrently using asyncio
     # Each agent will execute its task independently
-    await asyncio.gather(*[agent.run() for agent in agents])
+    # Jobs saved from now on belong to this run and are exported when it ends
+    run_started_at = datetime.datetime.now().isoformat(timespec='microseconds')
+    try:
+        await asyncio.gather(*[agent.run() for agent in agents])
+    finally:
+        # Write the jobs saved during this run to a CSV file, if there are any
+        export_run_jobs_to_csv(run_started_at)
+        # Agents don't close contexts they were given, so close them here
+        await asyncio.gather(*[context.close() for context in contexts])
 
 
 # Entry point - run the main function when script is executed directly
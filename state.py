@@ -0,0 +1,14 @@
+import asyncio
+
+# Shared state for agents running in parallel browser contexts
+
+# Held while one agent waits for the user to log in to LinkedIn manually,
+# so the login prompt is only shown in one browser window at a time
+linkedin_login_lock = asyncio.Lock()
+
+# True once the user has logged in to LinkedIn in any browser context
+linkedin_logged_in = False
+
+# LinkedIn session cookies captured after the manual login, copied into
+# the other browser contexts so they don't need to log in again
+linkedin_cookies = []